@@ -1,7 +1,11 @@
 """
 Migration script to create Genre and SubGenre tables and populate from genres_and_topics.toml
+
+Safe to re-run: rows that already exist are skipped, and anything missing
+(e.g. after a partial earlier run or new TOML entries) is added.
 """
 import toml
+from sqlalchemy.dialects import postgresql, sqlite
 from bookapp.app import app
 from bookapp.models import db, Genre, SubGenre, Topic, GenreMap
 
@@ -11,6 +15,14 @@ def load_genres_from_toml():
         data = toml.load(f)
     return data
 
+def insert_missing(model, rows, index_elements):
+    """INSERT rows in one executemany, skipping any that conflict on index_elements"""
+    if not rows:
+        return
+    dialect_insert = postgresql.insert if db.engine.dialect.name == 'postgresql' else sqlite.insert
+    stmt = dialect_insert(model).on_conflict_do_nothing(index_elements=index_elements)
+    db.session.execute(stmt, rows)
+
 def migrate():
     with app.app_context():
         print("Creating Genre, SubGenre, Topic, and GenreMap tables...")
@@ -18,71 +30,44 @@ def migrate():
         # Create tables
         db.create_all()
         
-        # Check if already populated
-        if Genre.query.first():
-            print("Genre table already populated.")
-        else:
-            print("Loading data from genres_and_topics.toml...")
-            data = load_genres_from_toml()
-            
-            # Process Fiction and Non-Fiction genres
-            genres_data = data['genres']
-            for book_type, genres in genres_data.items():
-                print(f"\nProcessing {book_type} genres...")
-                
-                for genre_name, sub_genres in genres.items():
-                    # Create genre
-                    genre = Genre(book_type=book_type, name=genre_name)
-                    db.session.add(genre)
-                    db.session.flush()  # Get the genre ID
-                    
-                    print(f"  Added genre: {genre_name}")
-                    
-                    # Create sub-genres
-                    for sub_genre_name in sub_genres:
-                        sub_genre = SubGenre(genre_id=genre.id, name=sub_genre_name)
-                        db.session.add(sub_genre)
-                        print(f"    Added sub-genre: {sub_genre_name}")
-            
-            db.session.commit()
-            genre_count = Genre.query.count()
-            sub_genre_count = SubGenre.query.count()
-            print(f"\n✅ Genres migrated: {genre_count} genres, {sub_genre_count} sub-genres")
+        print("Loading data from genres_and_topics.toml...")
+        data = load_genres_from_toml()
+        
+        # Process Fiction and Non-Fiction genres, then look up every genre id
+        # (new or pre-existing) so sub-genres can be inserted in a second batch
+        genres_data = data['genres']
+        insert_missing(Genre, [
+            {'book_type': book_type, 'name': genre_name}
+            for book_type, genres in genres_data.items()
+            for genre_name in genres
+        ], ['book_type', 'name'])
+        genre_ids = {
+            (book_type, name): id
+            for id, book_type, name in db.session.query(Genre.id, Genre.book_type, Genre.name)
+        }
+        insert_missing(SubGenre, [
+            {'genre_id': genre_ids[(book_type, genre_name)], 'name': sub_genre_name}
+            for book_type, genres in genres_data.items()
+            for genre_name, sub_genres in genres.items()
+            for sub_genre_name in sub_genres
+        ], ['genre_id', 'name'])
         
         # Process Topics
-        if Topic.query.first():
-            print("\nTopic table already populated.")
-        else:
-            print("\nProcessing topics...")
-            data = load_genres_from_toml()
-            topics_data = data.get('topics', [])
-            
-            for topic_name in topics_data:
-                topic = Topic(name=topic_name)
-                db.session.add(topic)
-                print(f"  Added topic: {topic_name}")
-            
-            db.session.commit()
-            topic_count = Topic.query.count()
-            print(f"\n✅ Topics migrated: {topic_count} topics")
+        insert_missing(Topic, [
+            {'name': topic_name} for topic_name in data.get('topics', [])
+        ], ['name'])
         
         # Process Genre Maps
-        if GenreMap.query.first():
-            print("\nGenreMap table already populated.")
-        else:
-            print("\nProcessing genre mappings...")
-            data = load_genres_from_toml()
-            genre_maps_data = data.get('genre_maps', {})
-            
-            for alternative, canonical in genre_maps_data.items():
-                genre_map = GenreMap(alternative_name=alternative, canonical_name=canonical)
-                db.session.add(genre_map)
-                print(f"  Added mapping: {alternative} -> {canonical}")
-            
-            db.session.commit()
-            map_count = GenreMap.query.count()
-            print(f"\n✅ Genre maps migrated: {map_count} mappings")
+        insert_missing(GenreMap, [
+            {'alternative_name': alternative, 'canonical_name': canonical}
+            for alternative, canonical in data.get('genre_maps', {}).items()
+        ], ['alternative_name'])
+        
+        db.session.commit()
         
+        print(f"\n✅ Genres: {Genre.query.count()} genres, {SubGenre.query.count()} sub-genres")
+        print(f"✅ Topics: {Topic.query.count()} topics")
+        print(f"✅ Genre maps: {GenreMap.query.count()} mappings")
         print(f"\n🎉 Migration complete!")
 
 
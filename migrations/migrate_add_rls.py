@@ -11,6 +11,29 @@ from bookapp.app import app
 from bookapp.models import db
 
 
+def split_sql_statements(sql_content):
+    """Split a SQL script on trailing semicolons, keeping $$-quoted function bodies whole"""
+    statements = []
+    current_statement = []
+    in_dollar_quote = False
+    
+    for line in sql_content.split('\n'):
+        # Skip comment-only lines
+        if not in_dollar_quote and (line.strip().startswith('--') or not line.strip()):
+            continue
+        
+        current_statement.append(line)
+        if line.count('$$') % 2 == 1:
+            in_dollar_quote = not in_dollar_quote
+        
+        # Check if line ends with semicolon (end of statement)
+        if not in_dollar_quote and line.strip().endswith(';'):
+            statements.append('\n'.join(current_statement))
+            current_statement = []
+    
+    return statements
+
+
 def migrate():
     with app.app_context():
         print("=" * 80)
@@ -31,24 +54,7 @@ def migrate():
         with open(sql_file, 'r') as f:
             sql_content = f.read()
         
-        # Split by statement (simple approach - assumes statements end with ;)
-        # Filter out comments and empty lines
-        statements = []
-        current_statement = []
-        
-        for line in sql_content.split('\n'):
-            # Skip comment-only lines
-            if line.strip().startswith('--') or not line.strip():
-                continue
-            
-            current_statement.append(line)
-            
-            # Check if line ends with semicolon (end of statement)
-            if line.strip().endswith(';'):
-                statement = '\n'.join(current_statement)
-                statements.append(statement)
-                current_statement = []
-        
+        statements = split_sql_statements(sql_content)
         print(f"Found {len(statements)} SQL statements to execute.\n")
         
         # Get database dialect
@@ -70,24 +76,24 @@ def migrate():
         success_count = 0
         error_count = 0
         
-        for i, statement in enumerate(statements, 1):
-            # Get first meaningful line for display
-            first_line = statement.strip().split('\n')[0][:60]
-            
-            try:
-                db.session.execute(db.text(statement))
-                db.session.commit()
-                success_count += 1
-                print(f"✅ [{i}/{len(statements)}] {first_line}...")
-            except Exception as e:
-                error_count += 1
-                print(f"❌ [{i}/{len(statements)}] {first_line}...")
-                print(f"   Error: {str(e)[:100]}")
+        # One transaction and one commit for the whole file; each statement runs in a
+        # savepoint so a failure (e.g. policy already exists) only undoes that statement
+        with db.engine.begin() as conn:
+            for i, statement in enumerate(statements, 1):
+                # Get first meaningful line for display
+                first_line = statement.strip().split('\n')[0][:60]
                 
-                # Don't fail the entire migration on errors
-                # Some statements might fail if already applied
-                db.session.rollback()
-                continue
+                try:
+                    with conn.begin_nested():
+                        conn.execute(db.text(statement))
+                    success_count += 1
+                    print(f"✅ [{i}/{len(statements)}] {first_line}...")
+                except Exception as e:
+                    # Don't fail the entire migration on errors
+                    # Some statements might fail if already applied
+                    error_count += 1
+                    print(f"❌ [{i}/{len(statements)}] {first_line}...")
+                    print(f"   Error: {str(e)[:100]}")
         
         print("\n" + "=" * 80)
         print("MIGRATION SUMMARY")
@@ -17,6 +17,12 @@ def add_unique_constraint():
         
         print(f"Database dialect: {dialect}")
         
+        if dialect == 'postgresql':
+            # Index (author, title) first so the duplicate GROUP BY below can use it.
+            # CONCURRENTLY avoids locking out writes but cannot run inside a transaction.
+            with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                conn.execute(text("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_book_author_title ON book (author, title)"))
+        
         # First, identify and remove any duplicate books
         # Keep the oldest version of each duplicate
         duplicates_query = text("""
@@ -36,41 +42,23 @@ def add_unique_constraint():
                     author, title, count, keep_id = row
                     print(f"  - '{title}' by {author}: {count} copies (keeping id={keep_id})")
                 
-                # For each set of duplicates, delete all except the one we're keeping
-                for row in duplicates:
-                    author, title, count, keep_id = row
-                    
-                    # Get all IDs for this author+title combination
-                    find_dups = text("""
-                        SELECT id FROM book
-                        WHERE author = :author AND title = :title
-                        AND id != :keep_id
-                    """)
-                    dup_ids_result = conn.execute(find_dups, {
-                        'author': author,
-                        'title': title,
-                        'keep_id': keep_id
-                    })
-                    dup_ids = [row[0] for row in dup_ids_result.fetchall()]
-                    
-                    if dup_ids:
-                        print(f"  Deleting duplicate IDs: {dup_ids}")
-                        
-                        # Delete related records first (to avoid FK constraints)
-                        for table in ['reading_list_item', 'book_read', 'review', 'suggested_book']:
-                            delete_related = text(f"""
-                                DELETE FROM {table}
-                                WHERE book_id IN :ids
-                            """)
-                            conn.execute(delete_related, {'ids': tuple(dup_ids)})
-                        
-                        # Now delete the duplicate books
-                        delete_books = text("""
-                            DELETE FROM book
-                            WHERE id IN :ids
-                        """)
-                        conn.execute(delete_books, {'ids': tuple(dup_ids)})
-                        conn.commit()
+                # Delete every non-kept copy in one set-based statement per table,
+                # child tables first (to avoid FK constraints), all in one transaction
+                victims = """
+                    SELECT b.id FROM book b
+                    JOIN (
+                        SELECT author, title, MIN(id) AS keep_id
+                        FROM book
+                        GROUP BY author, title
+                        HAVING COUNT(*) > 1
+                    ) k ON b.author = k.author AND b.title = k.title
+                    WHERE b.id != k.keep_id
+                """
+                for table in ['reading_list_item', 'book_read', 'review', 'suggested_book']:
+                    conn.execute(text(f"DELETE FROM {table} WHERE book_id IN ({victims})"))
+                deleted = conn.execute(text(f"DELETE FROM book WHERE id IN ({victims})"))
+                conn.commit()
+                print(f"  Deleted {deleted.rowcount} duplicate book(s)")
                 
                 print("\nDuplicates removed.")
             else:
@@ -80,33 +68,47 @@ def add_unique_constraint():
         print("\nAdding unique constraint on (author, title)...")
         
         try:
-            with engine.connect() as conn:
-                if dialect == 'sqlite':
-                    # SQLite doesn't support adding constraints to existing tables
-                    # We need to check if it exists in the new table definition
-                    print("SQLite: The constraint will be applied when you recreate the database")
-                    print("or when you create new tables with the updated models.py")
-                    print("\nFor existing SQLite databases, the constraint is enforced at the application level.")
-                    
-                elif dialect == 'postgresql':
-                    # PostgreSQL supports adding constraints
-                    add_constraint = text("""
-                        ALTER TABLE book
-                        ADD CONSTRAINT uq_author_title UNIQUE (author, title)
-                    """)
-                    
-                    try:
-                        conn.execute(add_constraint)
-                        conn.commit()
-                        print("Unique constraint added successfully!")
-                    except Exception as e:
-                        if 'already exists' in str(e).lower():
-                            print("Constraint already exists.")
-                        else:
-                            raise
+            if dialect == 'sqlite':
+                # SQLite doesn't support adding constraints to existing tables
+                # We need to check if it exists in the new table definition
+                print("SQLite: The constraint will be applied when you recreate the database")
+                print("or when you create new tables with the updated models.py")
+                print("\nFor existing SQLite databases, the constraint is enforced at the application level.")
                 
-                else:
-                    print(f"Unknown dialect: {dialect}. Manual migration may be required.")
+            elif dialect == 'postgresql':
+                # PostgreSQL supports adding constraints. Build the unique index
+                # concurrently, then promote it, so writes are not blocked during the build.
+                with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as ac:
+                    already_exists = ac.execute(text(
+                        "SELECT 1 FROM pg_constraint WHERE conname = 'uq_author_title'"
+                    )).first()
+                    if already_exists:
+                        print("Constraint already exists.")
+                    else:
+                        # A CONCURRENTLY build that failed part-way (e.g. a duplicate was
+                        # inserted during it) leaves an INVALID index behind; drop it so it
+                        # can be rebuilt. A leftover valid index makes the CREATE fail loudly.
+                        index_valid = ac.execute(text("""
+                            SELECT i.indisvalid FROM pg_index i
+                            JOIN pg_class c ON c.oid = i.indexrelid
+                            WHERE c.relname = 'uq_author_title'
+                        """)).scalar()
+                        if index_valid is False:
+                            print("Dropping invalid uq_author_title index left by an earlier failed build...")
+                            ac.execute(text("DROP INDEX CONCURRENTLY uq_author_title"))
+                        ac.execute(text(
+                            "CREATE UNIQUE INDEX CONCURRENTLY uq_author_title ON book (author, title)"
+                        ))
+                        ac.execute(text("""
+                            ALTER TABLE book
+                            ADD CONSTRAINT uq_author_title UNIQUE USING INDEX uq_author_title
+                        """))
+                        print("Unique constraint added successfully!")
+                    # The unique index covers the same columns, so the helper index is redundant
+                    ac.execute(text("DROP INDEX CONCURRENTLY IF EXISTS ix_book_author_title"))
+            
+            else:
+                print(f"Unknown dialect: {dialect}. Manual migration may be required.")
         
         except Exception as e:
             print(f"Error adding constraint: {e}")
@@ -1,6 +1,7 @@
 """
 Helper script to create an admin user
 """
+from sqlalchemy import or_
 from bookapp.app import app, db
 from bookapp.models import User
 
@@ -10,18 +11,16 @@ def create_admin():
         print("-" * 40)
         
         username = input("Username: ")
+        email = input("Email: ")
         
-        # Check if user already exists
-        existing_user = User.query.filter_by(username=username).first()
-        if existing_user:
+        # Check username and email in one query
+        taken = db.session.query(User.username, User.email).filter(
+            or_(User.username == username, User.email == email)
+        ).all()
+        if any(taken_username == username for taken_username, _ in taken):
             print(f"Error: Username '{username}' already exists!")
             return
-        
-        email = input("Email: ")
-        
-        # Check if email already exists
-        existing_email = User.query.filter_by(email=email).first()
-        if existing_email:
+        if any(taken_email == email for _, taken_email in taken):
             print(f"Error: Email '{email}' already registered!")
             return
         
@@ -3,20 +3,23 @@ Initialize or update database schema.
 This script creates all tables based on the SQLAlchemy models.
 Safe to run multiple times - will only create missing tables.
 """
+from sqlalchemy import inspect
 from bookapp.app import app
 from bookapp.models import db
 
 def init_db():
     with app.app_context():
-        # Create all tables defined in models.py
-        # This is safe to run - it only creates tables that don't exist
-        db.create_all()
+        # Reflect existing tables once, then create only the missing ones
+        # (in dependency order) in a single transaction
+        existing = set(inspect(db.engine).get_table_names())
+        missing = [t for t in db.metadata.sorted_tables if t.name not in existing]
+        if missing:
+            with db.engine.begin() as conn:
+                db.metadata.create_all(conn, tables=missing, checkfirst=False)
         print("Database tables created/verified successfully!")
         
         # Print all tables
-        from sqlalchemy import inspect
-        inspector = inspect(db.engine)
-        tables = inspector.get_table_names()
+        tables = sorted(existing | {t.name for t in missing})
         print(f"\nCurrent tables in database: {', '.join(tables)}")
 
 if __name__ == '__main__':
@@ -1,8 +1,12 @@
+from sqlalchemy.orm import load_only
 from bookapp.app import db, app
 from bookapp.models import Review, User, Book
 
 app.app_context().push()
 
-# To see all reviews:
-for r in Review.query.all():
+# To see all reviews (streamed in batches, skipping the long free-text answers):
+stmt = db.select(Review).options(
+    load_only(Review.id, Review.user_id, Review.book_id, Review.rating, Review.created_at)
+).execution_options(yield_per=1000)
+for r in db.session.scalars(stmt):
     print(f"Review ID: {r.id}, User: {r.user_id}, Book: {r.book_id}, Rating: {r.rating}, Type: {type(r.rating)}, Created: {r.created_at}")
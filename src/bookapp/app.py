@@ -1,17 +1,24 @@
 import click
 from flask import Flask, render_template, redirect, url_for, flash, request, send_file, jsonify
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-from functools import wraps
+from functools import wraps, lru_cache
+import hashlib
+import io
 import os
+import sqlite3
 from bookapp.config import Config
-from bookapp.models import db, User, Class, Book, Review, BookRead, ReadingListItem, SuggestedBook, BookSuggestion, BookEditSuggestion, Genre, SubGenre, Topic, GenreMap
+from bookapp.models import db, User, Class, Book, Review, BookRead, ReadingListItem, SuggestedBook, BookSuggestion, BookEditSuggestion, Genre, SubGenre, Topic, GenreMap, class_students, normalize_text, BOOK_TYPES
 from bookapp.forms import (LoginForm, RegistrationForm, ClassForm, BookForm, CSVUploadForm, 
                    ReviewForm, SuggestBookForm, SearchBookForm, StudentBookFilterForm, BookSuggestionForm)
 from bookapp.openlibrary_service import OpenLibraryService
-from bookapp.book_import_service import BookImportService, enrich_book_from_openlibrary
+from bookapp.book_import_service import (BookImportService, enrich_book_from_openlibrary,
+                                         search_openlibrary_for_books, apply_openlibrary_work)
 from datetime import datetime
-import io
-from sqlalchemy import or_
+import time
+from sqlalchemy import or_, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload, contains_eager, raiseload, load_only
 from bookapp.rls_middleware import setup_rls_middleware
 
 # Get project root directory (2 levels up from this file)
@@ -30,6 +37,18 @@ login_manager.login_view = 'login'
 
 setup_rls_middleware(app)
 
+@event.listens_for(Engine, 'connect')
+def _set_sqlite_pragmas(dbapi_conn, connection_record):
+    """Use WAL journaling and relaxed fsync on every new SQLite connection"""
+    if not isinstance(dbapi_conn, sqlite3.Connection):
+        return
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")  # Readers no longer block on a writer
+    cursor.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL; skips an fsync per commit
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=134217728")  # 128MB
+    cursor.close()
+
 @login_manager.user_loader
 def load_user(user_id):
     return User.query.get(int(user_id))
@@ -50,6 +69,44 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def reading_chart_counts(user_id):
+    """Count a student's read books by type, genre and grade for the dashboard charts"""
+    def grouped(column, *criteria):
+        return dict(
+            db.session.query(column, db.func.count())
+            .select_from(BookRead)
+            .join(Book, BookRead.book_id == Book.id)
+            .filter(BookRead.user_id == user_id, *criteria)
+            .group_by(column)
+            .all()
+        )
+    
+    type_counts = {'Fiction': 0, 'Non-Fiction': 0}
+    type_counts.update(grouped(Book.book_type, Book.book_type.in_(['Fiction', 'Non-Fiction'])))
+    genre_counts = grouped(Book.genre, Book.genre.isnot(None), Book.genre != '')
+    grade_counts = grouped(Book.grade, Book.grade.isnot(None))
+    return type_counts, genre_counts, grade_counts
+
+# Distinct genre/sub-genre values for the filter dropdowns. These change rarely, so
+# they are cached per process and dropped whenever a route writes to the book table.
+# The TTL bounds staleness in other worker processes that never see the invalidation.
+FILTER_CHOICES_TTL = 300
+_filter_choices_cache = {'genres': None, 'sub_genres': None, 'loaded_at': 0.0}
+
+def get_filter_choices():
+    """Return sorted distinct (genres, sub_genres) present on books"""
+    cache = _filter_choices_cache
+    if cache['genres'] is None or time.monotonic() - cache['loaded_at'] > FILTER_CHOICES_TTL:
+        cache['genres'] = sorted(g[0] for g in db.session.query(Book.genre).distinct() if g[0])
+        cache['sub_genres'] = sorted(sg[0] for sg in db.session.query(Book.sub_genre).distinct() if sg[0])
+        cache['loaded_at'] = time.monotonic()
+    return cache['genres'], cache['sub_genres']
+
+def invalidate_filter_choices():
+    """Forget cached filter choices after books are added, edited or removed"""
+    _filter_choices_cache['genres'] = None
+    _filter_choices_cache['sub_genres'] = None
+
 # Routes
 @app.route('/')
 def index():
@@ -93,7 +150,16 @@ def register():
         )
         user.set_password(form.password.data)
         db.session.add(user)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError as e:
+            # The unique constraints on username/email are the uniqueness check
+            db.session.rollback()
+            if 'username' in str(e.orig):
+                form.username.errors.append('Username already exists. Please choose a different one.')
+            else:
+                form.email.errors.append('Email already registered. Please use a different one.')
+            return render_template('register.html', form=form)
         flash('Registration successful! Please log in.', 'success')
         return redirect(url_for('login'))
     
@@ -114,30 +180,21 @@ def admin_dashboard():
     classes = Class.query.filter_by(teacher_id=current_user.id).all()
     total_students = User.query.filter_by(role='student').count()
     total_books = Book.query.count()
-    recent_reviews = Review.query.order_by(Review.created_at.desc()).limit(5).all()
-    
-    # Find books in reading lists that are not owned
-    # Get all unique book IDs from reading lists
-    reading_list_book_ids = db.session.query(ReadingListItem.book_id).distinct().all()
-    reading_list_book_ids = [book_id[0] for book_id in reading_list_book_ids]
-    
-    # Query books that are in reading lists and not owned
-    books_needed = Book.query.filter(
-        Book.id.in_(reading_list_book_ids),
+    recent_reviews = Review.query.options(
+        selectinload(Review.user), selectinload(Review.book), raiseload('*')
+    ).order_by(Review.created_at.desc()).limit(5).all()
+    
+    # Find books in reading lists that are not owned, with how many students
+    # have each one in their reading list, counted in a single GROUP BY
+    student_count = db.func.count(ReadingListItem.id)
+    books_needed = db.session.query(Book, student_count).join(
+        ReadingListItem, ReadingListItem.book_id == Book.id
+    ).filter(
         Book.owned == 'Not Owned'
-    ).all()
-    
-    # Count how many students have each book in their reading list
-    books_needed_with_counts = []
-    for book in books_needed:
-        student_count = ReadingListItem.query.filter_by(book_id=book.id).count()
-        books_needed_with_counts.append({
-            'book': book,
-            'student_count': student_count
-        })
-    
-    # Sort by student count (descending)
-    books_needed_with_counts.sort(key=lambda x: x['student_count'], reverse=True)
+    ).group_by(Book.id).order_by(student_count.desc(), Book.id).all()
+    books_needed_with_counts = [
+        {'book': book, 'student_count': count} for book, count in books_needed
+    ]
     
     # Count pending book suggestions from students
     pending_suggestions = BookSuggestion.query.filter_by(status='pending').count()
@@ -179,27 +236,46 @@ def create_class():
 @login_required
 @admin_required
 def view_class(class_id):
-    cls = Class.query.get_or_404(class_id)
-    if cls.teacher_id != current_user.id:
+    cls = Class.query.filter_by(id=class_id, teacher_id=current_user.id).first()
+    if cls is None:
         flash('Access denied.', 'danger')
         return redirect(url_for('admin_classes'))
     
-    all_students = User.query.filter_by(role='student').all()
-    return render_template('admin/view_class.html', cls=cls, all_students=all_students)
+    # Only the columns the "Add Students" dropdown shows, for students not already enrolled
+    enrolled_ids = db.session.query(class_students.c.student_id).filter(class_students.c.class_id == cls.id)
+    all_students = db.session.query(User.id, User.first_name, User.last_name, User.email).filter(
+        User.role == 'student', User.id.notin_(enrolled_ids)
+    ).all()
+    # Books-read count per enrolled student in one query instead of loading each student's list
+    read_counts = dict(
+        db.session.query(BookRead.user_id, db.func.count(BookRead.id))
+        .join(class_students, class_students.c.student_id == BookRead.user_id)
+        .filter(class_students.c.class_id == cls.id)
+        .group_by(BookRead.user_id)
+    )
+    return render_template('admin/view_class.html', cls=cls, all_students=all_students,
+                           read_counts=read_counts)
 
 @app.route('/admin/class/<int:class_id>/add_student/<int:student_id>')
 @login_required
 @admin_required
 def add_student_to_class(class_id, student_id):
-    cls = Class.query.get_or_404(class_id)
-    student = User.query.get_or_404(student_id)
-    
-    if cls.teacher_id != current_user.id:
+    # Fetch and ownership check in one query
+    owns_class = db.session.query(
+        Class.query.filter_by(id=class_id, teacher_id=current_user.id).exists()
+    ).scalar()
+    if not owns_class:
         flash('Access denied.', 'danger')
         return redirect(url_for('admin_classes'))
+    student = User.query.get_or_404(student_id)
     
-    if student not in cls.students:
-        cls.students.append(student)
+    # Check and write the association row directly rather than loading cls.students
+    already_enrolled = db.session.query(db.exists().where(
+        class_students.c.class_id == class_id,
+        class_students.c.student_id == student_id
+    )).scalar()
+    if not already_enrolled:
+        db.session.execute(class_students.insert().values(class_id=class_id, student_id=student_id))
         db.session.commit()
         flash(f'{student.first_name} {student.last_name} added to class.', 'success')
     else:
@@ -211,16 +287,21 @@ def add_student_to_class(class_id, student_id):
 @login_required
 @admin_required
 def remove_student_from_class(class_id, student_id):
-    cls = Class.query.get_or_404(class_id)
-    student = User.query.get_or_404(student_id)
-    
-    if cls.teacher_id != current_user.id:
+    owns_class = db.session.query(
+        Class.query.filter_by(id=class_id, teacher_id=current_user.id).exists()
+    ).scalar()
+    if not owns_class:
         flash('Access denied.', 'danger')
         return redirect(url_for('admin_classes'))
     
-    if student in cls.students:
-        cls.students.remove(student)
-        db.session.commit()
+    result = db.session.execute(class_students.delete().where(
+        class_students.c.class_id == class_id,
+        class_students.c.student_id == student_id
+    ))
+    db.session.commit()
+    if result.rowcount:
+        # Only look the student up when there is something to report
+        student = User.query.get(student_id)
         flash(f'{student.first_name} {student.last_name} removed from class.', 'success')
     
     return redirect(url_for('view_class', class_id=class_id))
@@ -234,27 +315,17 @@ def view_student(student_id):
         flash('Invalid student.', 'danger')
         return redirect(url_for('admin_dashboard'))
     
-    books_read = BookRead.query.filter_by(user_id=student_id).all()
-    reviews = Review.query.filter_by(user_id=student_id).all()
-    reading_list = ReadingListItem.query.filter_by(user_id=student_id).order_by(ReadingListItem.order).all()
-    
-    # Calculate chart data
-    type_counts = {'Fiction': 0, 'Non-Fiction': 0}
-    genre_counts = {}
-    grade_counts = {}
+    books_read = BookRead.query.options(
+        selectinload(BookRead.book), raiseload('*')
+    ).filter_by(user_id=student_id).all()
+    reviews = Review.query.options(
+        selectinload(Review.book), raiseload('*')
+    ).filter_by(user_id=student_id).all()
+    reading_list = ReadingListItem.query.options(
+        selectinload(ReadingListItem.book), raiseload('*')
+    ).filter_by(user_id=student_id).order_by(ReadingListItem.order).all()
     
-    for br in books_read:
-        # Type breakdown
-        if br.book.book_type in ['Fiction', 'Non-Fiction']:
-            type_counts[br.book.book_type] += 1
-        
-        # Genre breakdown
-        if br.book.genre:
-            genre_counts[br.book.genre] = genre_counts.get(br.book.genre, 0) + 1
-        
-        # Grade breakdown
-        if br.book.grade is not None:
-            grade_counts[br.book.grade] = grade_counts.get(br.book.grade, 0) + 1
+    type_counts, genre_counts, grade_counts = reading_chart_counts(student_id)
     
     return render_template('admin/view_student.html', 
                          student=student,
@@ -274,10 +345,9 @@ def admin_books():
     # Build filter form with dynamic choices
     filter_form = StudentBookFilterForm(request.args)
     # Populate genre/sub-genre choices dynamically from DB
-    genres = [g[0] for g in db.session.query(Book.genre).distinct() if g[0]]
-    sub_genres = [sg[0] for sg in db.session.query(Book.sub_genre).distinct() if sg[0]]
-    filter_form.genre.choices = [('', 'Any'), ('__not_set__', 'Not Set')] + [(g, g) for g in sorted(genres)]
-    filter_form.sub_genre.choices = [('', 'Any'), ('__not_set__', 'Not Set')] + [(sg, sg) for sg in sorted(sub_genres)]
+    genres, sub_genres = get_filter_choices()
+    filter_form.genre.choices = [('', 'Any'), ('__not_set__', 'Not Set')] + [(g, g) for g in genres]
+    filter_form.sub_genre.choices = [('', 'Any'), ('__not_set__', 'Not Set')] + [(sg, sg) for sg in sub_genres]
 
     # Apply filters
     query = Book.query
@@ -308,8 +378,15 @@ def admin_books():
     if filter_form.missing_olid.data:
         query = query.filter(or_(Book.openlibrary_id == None, Book.openlibrary_id == ''))
 
-    books = query.all()
-    return render_template('admin/books.html', books=books, search_form=search_form, filter_form=filter_form)
+    page = request.args.get('page', 1, type=int)
+    # Only the columns the table shows; description and cover_url stay unloaded
+    query = query.options(load_only(
+        Book.id, Book.title, Book.author, Book.openlibrary_id, Book.book_type, Book.genre,
+        Book.sub_genre, Book.lexile_rating, Book.grade, Book.owned
+    ))
+    pagination = query.order_by(Book.title).paginate(page=page, per_page=50, error_out=False)
+    return render_template('admin/books.html', books=pagination.items, pagination=pagination,
+                           search_form=search_form, filter_form=filter_form)
 
 @app.route('/admin/book/create', methods=['GET', 'POST'])
 @login_required
@@ -318,12 +395,10 @@ def create_book():
     form = BookForm()
     if form.validate_on_submit():
         # Check if book with same author and title already exists
-        existing_book = Book.query.filter_by(
+        if db.session.query(Book.query.filter_by(
             author=form.author.data,
             title=form.title.data
-        ).first()
-        
-        if existing_book:
+        ).exists()).scalar():
             flash(f'A book titled "{form.title.data}" by {form.author.data} already exists in the library.', 'danger')
             return render_template('admin/create_book.html', form=form)
         
@@ -345,6 +420,7 @@ def create_book():
         try:
             db.session.add(book)
             db.session.commit()
+            invalidate_filter_choices()
             flash('Book added successfully!', 'success')
             return redirect(url_for('admin_books'))
         except Exception as e:
@@ -422,6 +498,7 @@ def edit_book(book_id):
 
         try:
             db.session.commit()
+            invalidate_filter_choices()
             flash('Book updated successfully!', 'success')
             return redirect(url_for('admin_books'))
         except Exception as e:
@@ -456,6 +533,7 @@ def upload_books():
             form.csv_file.data, 
             skip_enrichment=form.skip_enrichment.data
         )
+        invalidate_filter_choices()
         
         if result['success_count'] > 0:
             flash(f"Successfully imported {result['success_count']} books!", 'success')
@@ -468,16 +546,25 @@ def upload_books():
     
     return render_template('admin/upload_books.html', form=form)
 
+@lru_cache(maxsize=1)
+def sample_csv_content():
+    """Build the sample CSV and its ETag once per process, on first download"""
+    data = BookImportService.create_sample_csv().encode('utf-8')
+    return data, hashlib.sha1(data).hexdigest()
+
 @app.route('/admin/books/sample_csv')
 @login_required
 @admin_required
 def download_sample_csv():
-    csv_content = BookImportService.create_sample_csv()
+    data, etag = sample_csv_content()
     return send_file(
-        io.BytesIO(csv_content.encode()),
+        io.BytesIO(data),
         mimetype='text/csv',
         as_attachment=True,
-        download_name='sample_books.csv'
+        download_name='sample_books.csv',
+        etag=etag,
+        conditional=True,
+        max_age=86400
     )
 
 @app.route('/admin/search_openlibrary', methods=['POST'])
@@ -503,14 +590,12 @@ def add_book_from_openlibrary():
     
     # Check if book already exists by openlibrary_id or author+title
     if openlibrary_id:
-        existing_book = Book.query.filter_by(openlibrary_id=openlibrary_id).first()
-        if existing_book:
+        if db.session.query(Book.query.filter_by(openlibrary_id=openlibrary_id).exists()).scalar():
             flash(f'Book "{title}" already exists in the library.', 'info')
             return redirect(url_for('admin_books'))
     
     # Also check by author and title
-    existing_book = Book.query.filter_by(author=author, title=title).first()
-    if existing_book:
+    if db.session.query(Book.query.filter_by(author=author, title=title).exists()).scalar():
         flash(f'Book "{title}" by {author} already exists in the library.', 'info')
         return redirect(url_for('admin_books'))
     
@@ -529,6 +614,7 @@ def add_book_from_openlibrary():
     try:
         db.session.add(book)
         db.session.commit()
+        invalidate_filter_choices()
     except Exception as e:
         db.session.rollback()
         flash(f'Error adding book: {str(e)}', 'danger')
@@ -553,6 +639,7 @@ def delete_book(book_id):
     
     db.session.delete(book)
     db.session.commit()
+    invalidate_filter_choices()
     flash('Book deleted successfully!', 'success')
     return redirect(url_for('admin_books'))
 
@@ -590,16 +677,16 @@ def bulk_book_action():
     
     if action == 'delete':
         # Check if any selected books have reviews
-        books_with_reviews = Book.query.filter(
+        titles_with_reviews = [title for title, in db.session.query(Book.title).filter(
             Book.id.in_(book_ids),
             Book.reviews.any()
-        ).all()
+        )]
         
-        if books_with_reviews:
-            titles = [b.title for b in books_with_reviews[:3]]
-            msg = f"Cannot delete {len(books_with_reviews)} book(s) with student reviews: {', '.join(titles)}"
-            if len(books_with_reviews) > 3:
-                msg += f" and {len(books_with_reviews) - 3} more"
+        if titles_with_reviews:
+            titles = titles_with_reviews[:3]
+            msg = f"Cannot delete {len(titles_with_reviews)} book(s) with student reviews: {', '.join(titles)}"
+            if len(titles_with_reviews) > 3:
+                msg += f" and {len(titles_with_reviews) - 3} more"
             flash(msg, 'danger')
             return redirect(url_for('admin_books', **filter_params))
         
@@ -608,6 +695,7 @@ def bulk_book_action():
         # Delete books
         Book.query.filter(Book.id.in_(book_ids)).delete(synchronize_session=False)
         db.session.commit()
+        invalidate_filter_choices()
         flash(f'{len(book_ids)} book(s) deleted successfully!', 'success')
     
     elif action == 'set_type':
@@ -629,6 +717,7 @@ def bulk_book_action():
         if genre:
             Book.query.filter(Book.id.in_(book_ids)).update({'genre': genre}, synchronize_session=False)
             db.session.commit()
+            invalidate_filter_choices()
             flash(f'{len(book_ids)} book(s) updated to genre "{genre}".', 'success')
     
     else:
@@ -643,9 +732,6 @@ def suggest_book(student_id):
     student = User.query.get_or_404(student_id)
     form = SuggestBookForm()
     
-    # Get all books for selection
-    books = Book.query.all()
-    
     if form.validate_on_submit():
         suggestion = SuggestedBook(
             student_id=student_id,
@@ -658,7 +744,25 @@ def suggest_book(student_id):
         flash(f'Book suggested to {student.first_name}!', 'success')
         return redirect(url_for('view_student', student_id=student_id))
     
-    return render_template('admin/suggest_book.html', student=student, books=books, form=form)
+    return render_template('admin/suggest_book.html', student=student, form=form)
+
+@app.route('/admin/book_search')
+@login_required
+@admin_required
+def admin_book_search():
+    """Return up to 20 books matching a title/author search, for autocomplete"""
+    term = (request.args.get('q') or '').strip()
+    if not term:
+        return jsonify([])
+    
+    like = f"%{term}%"
+    books = db.session.query(Book.id, Book.title, Book.author, Book.lexile_rating).filter(
+        or_(Book.title.ilike(like), Book.author.ilike(like))
+    ).order_by(Book.title).limit(20).all()
+    return jsonify([
+        {'id': b.id, 'title': b.title, 'author': b.author, 'lexile_rating': b.lexile_rating}
+        for b in books
+    ])
 
 # Student Routes
 @app.route('/student/dashboard')
@@ -667,28 +771,20 @@ def student_dashboard():
     if current_user.is_admin():
         return redirect(url_for('admin_dashboard'))
     
-    reading_list = ReadingListItem.query.filter_by(user_id=current_user.id).order_by(ReadingListItem.order).all()
-    books_read = BookRead.query.filter_by(user_id=current_user.id).order_by(BookRead.completed_at.desc()).all()
-    recent_reviews = Review.query.filter_by(user_id=current_user.id).order_by(Review.created_at.desc()).limit(3).all()
-    suggestions = SuggestedBook.query.filter_by(student_id=current_user.id, is_accepted=False).all()
-    
-    # Calculate chart data
-    type_counts = {'Fiction': 0, 'Non-Fiction': 0}
-    genre_counts = {}
-    grade_counts = {}
-    
-    for br in books_read:
-        # Type breakdown
-        if br.book.book_type in ['Fiction', 'Non-Fiction']:
-            type_counts[br.book.book_type] += 1
-        
-        # Genre breakdown
-        if br.book.genre:
-            genre_counts[br.book.genre] = genre_counts.get(br.book.genre, 0) + 1
-        
-        # Grade breakdown
-        if br.book.grade is not None:
-            grade_counts[br.book.grade] = grade_counts.get(br.book.grade, 0) + 1
+    reading_list = ReadingListItem.query.options(
+        selectinload(ReadingListItem.book), raiseload('*')
+    ).filter_by(user_id=current_user.id).order_by(ReadingListItem.order).all()
+    books_read = BookRead.query.options(
+        selectinload(BookRead.book), raiseload('*')
+    ).filter_by(user_id=current_user.id).order_by(BookRead.completed_at.desc()).all()
+    recent_reviews = Review.query.options(
+        selectinload(Review.book), raiseload('*')
+    ).filter_by(user_id=current_user.id).order_by(Review.created_at.desc()).limit(3).all()
+    suggestions = SuggestedBook.query.options(
+        selectinload(SuggestedBook.book), selectinload(SuggestedBook.suggested_by), raiseload('*')
+    ).filter_by(student_id=current_user.id, is_accepted=False).all()
+    
+    type_counts, genre_counts, grade_counts = reading_chart_counts(current_user.id)
     
     return render_template('student/dashboard.html',
                          reading_list=reading_list,
@@ -705,22 +801,19 @@ def student_reading_list():
     if current_user.is_admin():
         return redirect(url_for('admin_dashboard'))
     
-
-    reading_list = ReadingListItem.query.filter_by(user_id=current_user.id).order_by(ReadingListItem.order).all()
-    books_read = BookRead.query.filter_by(user_id=current_user.id).all()
-    read_book_ids = {br.book_id for br in books_read}
+    reading_list = ReadingListItem.query.options(
+        selectinload(ReadingListItem.book), raiseload('*')
+    ).filter_by(user_id=current_user.id).order_by(ReadingListItem.order).all()
 
     # Build filter form with dynamic choices
     filter_form = StudentBookFilterForm(request.args)
     # Populate genre/sub-genre choices dynamically from DB
-    genres = [g[0] for g in db.session.query(Book.genre).distinct() if g[0]]
-    sub_genres = [sg[0] for sg in db.session.query(Book.sub_genre).distinct() if sg[0]]
-    filter_form.genre.choices = [('', 'Any')] + [(g, g) for g in sorted(genres)]
-    filter_form.sub_genre.choices = [('', 'Any')] + [(sg, sg) for sg in sorted(sub_genres)]
+    genres, sub_genres = get_filter_choices()
+    filter_form.genre.choices = [('', 'Any')] + [(g, g) for g in genres]
+    filter_form.sub_genre.choices = [('', 'Any')] + [(sg, sg) for sg in sub_genres]
 
     # Get page number from query params
     page = request.args.get('page', 1, type=int)
-    per_page = 20
 
     # Apply filters to browseable books
     query = Book.query
@@ -741,22 +834,18 @@ def student_reading_list():
         query = query.filter(or_(Book.title.ilike(term), Book.author.ilike(term)))
 
     # Filter out books already read
-    all_books_filtered = [b for b in query.all() if b.id not in read_book_ids]
+    read_book_ids = db.session.query(BookRead.book_id).filter_by(user_id=current_user.id)
+    query = query.filter(~Book.id.in_(read_book_ids))
     
-    # Calculate pagination
-    total_books = len(all_books_filtered)
-    total_pages = (total_books + per_page - 1) // per_page  # Ceiling division
-    start_idx = (page - 1) * per_page
-    end_idx = start_idx + per_page
-    all_books = all_books_filtered[start_idx:end_idx]
+    pagination = query.order_by(Book.title).paginate(page=page, per_page=20, error_out=False)
 
     return render_template('student/reading_list.html', 
                           reading_list=reading_list, 
-                          all_books=all_books, 
+                          all_books=pagination.items, 
                           filter_form=filter_form,
                           page=page,
-                          total_pages=total_pages,
-                          total_books=total_books)
+                          total_pages=pagination.pages,
+                          total_books=pagination.total)
 
 @app.route('/student/add_to_reading_list/<int:book_id>')
 @login_required
@@ -764,19 +853,13 @@ def add_to_reading_list(book_id):
     book = Book.query.get_or_404(book_id)
     
     # Check if already in reading list
-    existing = ReadingListItem.query.filter_by(user_id=current_user.id, book_id=book_id).first()
+    existing = db.session.query(
+        ReadingListItem.query.filter_by(user_id=current_user.id, book_id=book_id).exists()
+    ).scalar()
     if existing:
         flash('Book already in your reading list.', 'info')
     else:
-        # Get next order number
-        max_order = db.session.query(db.func.max(ReadingListItem.order)).filter_by(user_id=current_user.id).scalar() or 0
-        
-        item = ReadingListItem(
-            user_id=current_user.id,
-            book_id=book_id,
-            order=max_order + 1
-        )
-        db.session.add(item)
+        ReadingListItem.append(current_user.id, book_id)
         db.session.commit()
         flash(f'"{book.title}" added to your reading list!', 'success')
     
@@ -803,7 +886,9 @@ def mark_book_read(book_id):
     book = Book.query.get_or_404(book_id)
     
     # Check if already marked as read
-    existing = BookRead.query.filter_by(user_id=current_user.id, book_id=book_id).first()
+    existing = db.session.query(
+        BookRead.query.filter_by(user_id=current_user.id, book_id=book_id).exists()
+    ).scalar()
     if existing:
         flash('You already marked this book as read.', 'info')
     else:
@@ -811,9 +896,9 @@ def mark_book_read(book_id):
         db.session.add(book_read)
         
         # Remove from reading list if present
-        reading_item = ReadingListItem.query.filter_by(user_id=current_user.id, book_id=book_id).first()
-        if reading_item:
-            db.session.delete(reading_item)
+        ReadingListItem.query.filter_by(
+            user_id=current_user.id, book_id=book_id
+        ).delete(synchronize_session=False)
         
         db.session.commit()
         flash(f'"{book.title}" marked as read! Now add a review.', 'success')
@@ -829,12 +914,14 @@ def books_read():
 
     # Filter form for books read (applies to underlying book fields)
     filter_form = StudentBookFilterForm(request.args)
-    genres = [g[0] for g in db.session.query(Book.genre).distinct() if g[0]]
-    sub_genres = [sg[0] for sg in db.session.query(Book.sub_genre).distinct() if sg[0]]
-    filter_form.genre.choices = [('', 'Any')] + [(g, g) for g in sorted(genres)]
-    filter_form.sub_genre.choices = [('', 'Any')] + [(sg, sg) for sg in sorted(sub_genres)]
+    genres, sub_genres = get_filter_choices()
+    filter_form.genre.choices = [('', 'Any')] + [(g, g) for g in genres]
+    filter_form.sub_genre.choices = [('', 'Any')] + [(sg, sg) for sg in sub_genres]
 
-    q = BookRead.query.filter_by(user_id=current_user.id).join(Book, BookRead.book_id == Book.id)
+    # Reuse the join to populate br.book rather than lazy-loading it per row
+    q = BookRead.query.filter_by(user_id=current_user.id).join(Book, BookRead.book_id == Book.id).options(
+        contains_eager(BookRead.book).defer(Book.description), raiseload('*')
+    )
     if filter_form.book_type.data:
         q = q.filter(Book.book_type == filter_form.book_type.data)
     if filter_form.genre.data:
@@ -851,10 +938,17 @@ def books_read():
         term = f"%{filter_form.search.data.strip()}%"
         q = q.filter(or_(Book.title.ilike(term), Book.author.ilike(term)))
 
-    books_read = q.order_by(BookRead.completed_at.desc()).all()
-    reviews = {r.book_id: r for r in Review.query.filter_by(user_id=current_user.id).all()}
+    page = request.args.get('page', 1, type=int)
+    pagination = q.order_by(BookRead.completed_at.desc()).paginate(page=page, per_page=20, error_out=False)
+    books_read = pagination.items
+    # Only fetch reviews for the books shown on this page
+    book_ids = [br.book_id for br in books_read]
+    reviews = {r.book_id: r for r in Review.query.filter(
+        Review.user_id == current_user.id, Review.book_id.in_(book_ids)
+    ).all()} if book_ids else {}
     
-    return render_template('student/books_read.html', books_read=books_read, reviews=reviews, filter_form=filter_form)
+    return render_template('student/books_read.html', books_read=books_read, pagination=pagination,
+                           reviews=reviews, filter_form=filter_form)
 
 @app.route('/student/review/<int:book_id>', methods=['GET', 'POST'])
 @login_required
@@ -862,8 +956,10 @@ def create_review(book_id):
     book = Book.query.get_or_404(book_id)
     
     # Check if book is marked as read
-    book_read = BookRead.query.filter_by(user_id=current_user.id, book_id=book_id).first()
-    if not book_read:
+    has_read = db.session.query(
+        BookRead.query.filter_by(user_id=current_user.id, book_id=book_id).exists()
+    ).scalar()
+    if not has_read:
         flash('You must mark the book as read before reviewing it.', 'warning')
         return redirect(url_for('student_dashboard'))
     
@@ -871,9 +967,7 @@ def create_review(book_id):
     existing_review = Review.query.filter_by(user_id=current_user.id, book_id=book_id).first()
     
     form = ReviewForm()
-    print("DEBUG: form.rating.data =", form.rating.data)
-    print("DEBUG: request.form.get('rating') =", request.form.get('rating'))
-        
+    
     if form.validate_on_submit():
         if existing_review:
             # Update existing review
@@ -922,13 +1016,7 @@ def accept_suggestion(suggestion_id):
     suggestion.is_accepted = True
     
     # Add to reading list
-    max_order = db.session.query(db.func.max(ReadingListItem.order)).filter_by(user_id=current_user.id).scalar() or 0
-    item = ReadingListItem(
-        user_id=current_user.id,
-        book_id=suggestion.book_id,
-        order=max_order + 1
-    )
-    db.session.add(item)
+    ReadingListItem.append(current_user.id, suggestion.book_id)
     db.session.commit()
     
     flash('Book added to your reading list!', 'success')
@@ -943,12 +1031,10 @@ def student_suggest_new_book():
     form = BookSuggestionForm()
     if form.validate_on_submit():
         # Check if book already exists in library
-        existing_book = Book.query.filter_by(
+        if db.session.query(Book.query.filter_by(
             author=form.author.data,
             title=form.title.data
-        ).first()
-        
-        if existing_book:
+        ).exists()).scalar():
             flash(f'"{form.title.data}" by {form.author.data} is already in the library!', 'info')
             return redirect(url_for('student_reading_list'))
         
@@ -1019,11 +1105,13 @@ def review_book_suggestion(suggestion_id):
     
     elif action == 'add':
         # Create the book and mark suggestion as added
-        existing_book = Book.query.filter_by(author=suggestion.author, title=suggestion.title).first()
+        existing_book_id = db.session.query(Book.id).filter_by(
+            author=suggestion.author, title=suggestion.title
+        ).scalar()
         
-        if existing_book:
+        if existing_book_id:
             flash(f'Book already exists in library!', 'warning')
-            suggestion.book_id = existing_book.id
+            suggestion.book_id = existing_book_id
             suggestion.status = 'added'
         else:
             # Create book with basic info
@@ -1051,6 +1139,7 @@ def review_book_suggestion(suggestion_id):
             suggestion.admin_notes = admin_notes
         
         db.session.commit()
+        invalidate_filter_choices()
     
     return redirect(url_for('admin_book_suggestions'))
 
@@ -1153,6 +1242,7 @@ def review_book_edit_suggestion(suggestion_id):
         suggestion.reviewed_at = datetime.utcnow()
         suggestion.admin_notes = admin_notes
         db.session.commit()
+        invalidate_filter_choices()
         flash(f'Approved edits for "{book.title}"!', 'success')
     
     elif action == 'reject':
@@ -1232,6 +1322,10 @@ def run_upgrade():
             alters.append("ALTER TABLE book ADD COLUMN owned VARCHAR(20) DEFAULT 'Not Owned'")
         else:  # PostgreSQL
             alters.append("ALTER TABLE book ADD COLUMN owned VARCHAR(20) DEFAULT 'Not Owned'")
+    if 'title_norm' not in existing_cols:
+        alters.append("ALTER TABLE book ADD COLUMN title_norm VARCHAR(200)")
+    if 'author_norm' not in existing_cols:
+        alters.append("ALTER TABLE book ADD COLUMN author_norm VARCHAR(200)")
     
     for stmt in alters:
         try:
@@ -1242,7 +1336,29 @@ def run_upgrade():
     if alters:
         db.session.commit()
         print('Database upgraded: added columns ->', ', '.join([s.split()[5] for s in alters]))
-    else:
+    
+    # Backfill normalized title/author for rows written before those columns existed
+    missing_norms = db.session.query(Book.id, Book.title, Book.author).filter(Book.title_norm.is_(None)).all()
+    if missing_norms:
+        db.session.execute(
+            db.update(Book),
+            [{'id': id, 'title_norm': normalize_text(title), 'author_norm': normalize_text(author)}
+             for id, title, author in missing_norms]
+        )
+        db.session.commit()
+        print(f'Database upgraded: normalized title/author for {len(missing_norms)} book(s)')
+    
+    # create_all() skips indexes on tables that already exist, so add any that are missing
+    new_indexes = []
+    for table in db.metadata.sorted_tables:
+        existing_indexes = {ix['name'] for ix in inspector.get_indexes(table.name)}
+        new_indexes.extend(ix for ix in table.indexes if ix.name not in existing_indexes)
+    for index in new_indexes:
+        index.create(db.engine, checkfirst=True)
+    
+    if new_indexes:
+        print('Database upgraded: added indexes ->', ', '.join(ix.name for ix in new_indexes))
+    elif not alters and not missing_norms:
         print('Database already up to date.')
 
 @app.cli.command('upgrade-db')
@@ -1255,15 +1371,28 @@ def upgrade_db():
 def enrich_missing_books(max: int):
     """Backfill book_type and sub_genre for books missing them using OpenLibrary subjects (requires ISBN)."""
     updated = 0
-    books = Book.query.all()
-    for ib, b in enumerate(books):
-        if max is not None and ib >= max:
-            break
-
-        updated += int(enrich_book_from_openlibrary(b))
-        
-    if updated:
-        db.session.commit()
+    # Only books with something left to fill in (mirrors CSVBookRecord.enrichable).
+    # Just the columns the lookups need, so no ORM state is held across them
+    query = db.session.query(Book.id, Book.title, Book.author).filter(or_(
+        Book.book_type.is_(None), Book.genre.is_(None), Book.sub_genre.is_(None),
+        Book.topic.is_(None), Book.publication_year.is_(None), Book.cover_url.is_(None),
+        Book.description.is_(None)
+    )).order_by(Book.id)
+    if max is not None:
+        query = query.limit(max)
+    candidates = query.all()
+    # End the read transaction so no connection stays checked out during the network lookups
+    db.session.commit()
+    
+    # Do every OpenLibrary lookup first (concurrently), outside any transaction
+    works = search_openlibrary_for_books(candidates)
+    found = {c.id: work for c, work in zip(candidates, works) if work is not None}
+    
+    # Then merge the results in one short transaction: committed at the end, rolled back on error
+    if found:
+        with db.session.begin():
+            for b in Book.query.filter(Book.id.in_(found)).order_by(Book.id):
+                updated += int(apply_openlibrary_work(b, found[b.id]))
         
     print(f"Enriched {updated} book(s)")
 
@@ -1457,7 +1586,7 @@ def delete_genre_map(map_id):
 @app.route('/api/genres/<book_type>')
 def api_get_genres(book_type):
     """API endpoint to get genres for a given book type"""
-    if book_type not in ['Fiction', 'Non-Fiction']:
+    if book_type not in BOOK_TYPES:
         return jsonify([])
     
     genres = Genre.query.filter_by(book_type=book_type).order_by(Genre.name).all()
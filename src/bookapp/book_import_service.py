@@ -1,74 +1,94 @@
 import csv
 import io
-import re
-from bookapp.models import Book, db
-from bookapp.openlibrary_service import OpenLibraryService
+import itertools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from bookapp.models import Book, db, normalize_text, BOOK_TYPES, OWNED_OPTIONS
+from bookapp.openlibrary_service import OpenLibraryService, OpenLibraryWork
 from bookapp.csv_cli import CSVBookRecord, select_best_work, WorkWrapper
 import attrs
 
+logger = logging.getLogger(__name__)
+
+# Concurrent OpenLibrary requests during CSV import; the work is network-bound
+OPENLIBRARY_WORKERS = 8
+# CSV rows parsed (and checked against the catalogue) per batch during import
+IMPORT_CHUNK_ROWS = 500
+
+_CSV_FIELD_NAMES = tuple(f.name for f in attrs.fields(CSVBookRecord))
+
 def book_to_csvbookrecord(b: Book) -> CSVBookRecord:
     """Convert a Book object to a CSV row dict"""
-    fields = attrs.fields(CSVBookRecord)
-    return CSVBookRecord(**{k.name: getattr(b, k.name) for k in fields})
+    return CSVBookRecord(**{name: getattr(b, name) for name in _CSV_FIELD_NAMES})
     
     
-def enrich_book_from_openlibrary(b: Book) -> bool:
-    """Enrich a Book object with data from OpenLibrary."""
-    record = book_to_csvbookrecord(b)
-    if not record.enrichable():
-        return False
-        
+def search_openlibrary_for_book(title: str, author: str) -> OpenLibraryWork | None:
+    """Find the top OpenLibrary work for a title and author, or None if there is no match."""
     try:
-        print("ABOUT TO SEARCH")
         results = OpenLibraryService.search_books(
-            f"{b.title} {b.author}",
+            f"{title} {author}",
             fields=['key', 'title', 'subject', 'first_publish_year', 'cover_i'], 
             limit=1
         )
-        print("DONE SEARCH")
-        if not results:
-            print(f"No OpenLibrary results found for '{b.title}' by {b.author}")
-            return False
-            
-        ol_data = results[0]
     except Exception as e:
-        print(f"OpenLibrary lookup failed for {b.author} {b.title}: {e}")
+        logger.warning("OpenLibrary lookup failed for %s %s: %s", author, title, e)
+        return None
+    
+    if not results:
+        logger.debug("No OpenLibrary results found for '%s' by %s", title, author)
+        return None
+    return results[0]
+
+def search_openlibrary_for_books(books: list[Book]) -> list[OpenLibraryWork | None]:
+    """Run search_openlibrary_for_book for many books concurrently, preserving order."""
+    # Read the attributes here so worker threads never touch the ORM session
+    pairs = [(b.title, b.author) for b in books]
+    with ThreadPoolExecutor(max_workers=OPENLIBRARY_WORKERS) as pool:
+        return list(pool.map(lambda pair: search_openlibrary_for_book(*pair), pairs))
+
+def enrich_book_from_openlibrary(b: Book) -> bool:
+    """Enrich a Book object with data from OpenLibrary."""
+    if not book_to_csvbookrecord(b).enrichable():
+        return False
+    
+    ol_data = search_openlibrary_for_book(b.title, b.author)
+    if ol_data is None:
         return False
+    return apply_openlibrary_work(b, ol_data)
 
-    print(f"Processing book: {b.title} by {b.author}.")
+def apply_openlibrary_work(b: Book, ol_data: OpenLibraryWork) -> bool:
+    """Merge an already-fetched OpenLibrary work into a Book; returns whether anything changed."""
+    logger.debug("Processing book: %s by %s.", b.title, b.author)
     
-    record = record.update_from_openlibrary_work(
+    record = book_to_csvbookrecord(b).update_from_openlibrary_work(
         WorkWrapper(ol_data, ask=False), quick=True
     )
-    print(record)
-    changed = False
-    for k in attrs.fields(CSVBookRecord):
-        old_value = getattr(b, k.name)
-        new_value = getattr(record, k.name)
-        if old_value != new_value:
-            setattr(b, k.name, new_value)
-            changed = True
-    print("CHANGED?", changed)   
+    diff = {name: getattr(record, name) for name in _CSV_FIELD_NAMES if getattr(record, name) != getattr(b, name)}
+    for name, value in diff.items():
+        setattr(b, name, value)
+    changed = bool(diff)
     if changed:
-        print(f"  >> Updated book: type={b.book_type}, genre={b.genre}, sub_genre={b.sub_genre}, publication_year={b.publication_year}")
+        logger.debug("Updated book: type=%s, genre=%s, sub_genre=%s, publication_year=%s",
+                     b.book_type, b.genre, b.sub_genre, b.publication_year)
         
     return changed
 
+def fetch_openlibrary_works(records: list[CSVBookRecord]) -> list:
+    """Look up the best OpenLibrary work for each record in parallel, preserving order"""
+    def fetch(record):
+        works = OpenLibraryService.author_title_search(title=record.title, author=record.author, fields="all", limit=1)
+        return select_best_work(works)
+    
+    with ThreadPoolExecutor(max_workers=OPENLIBRARY_WORKERS) as pool:
+        return list(pool.map(fetch, records))
+
 class BookImportService:
     """Service for importing books from CSV files"""
     
     @staticmethod
     def normalize_text(text: str) -> str:
         """Normalize text for fuzzy matching: lowercase, strip punctuation, normalize whitespace"""
-        if not text:
-            return ""
-        # Lowercase
-        normalized = text.lower()
-        # Remove punctuation (keep only alphanumeric and spaces)
-        normalized = re.sub(r'[^\w\s]', '', normalized)
-        # Normalize whitespace (collapse multiple spaces to single space, strip edges)
-        normalized = re.sub(r'\s+', ' ', normalized).strip()
-        return normalized
+        return normalize_text(text)
     
     @staticmethod
     def import_from_csv(csv_file, debug: bool = False, skip_enrichment: bool = False) -> dict:
@@ -92,109 +112,121 @@ class BookImportService:
         try:
             # Read CSV file
             if hasattr(csv_file, 'stream'):
-                stream = io.StringIO(csv_file.stream.read().decode("UTF8"), newline=None)    
+                # Decode incrementally rather than reading the whole upload into one string
+                stream = io.TextIOWrapper(csv_file.stream, encoding='utf-8', newline='')
                 csv_reader = csv.DictReader(stream)
             else:
+                stream = None
                 csv_reader = csv.DictReader(csv_file, delimiter=',')
-                
-            for row_num, row in enumerate(csv_reader, start=2):  # Start at 2 (1 is header)
-                try:
-                    if 'title' not in row or 'author' not in row:
-                        raise ValueError("Missing required 'title' or 'author' field")
-                    
-                    # Check if book already exists by title+author (fuzzy match)
-                    title_raw = (row.get('title') or '').strip()
-                    author_raw = (row.get('author') or '').strip()
-                    
-                    # Normalize for fuzzy matching
-                    title_normalized = BookImportService.normalize_text(title_raw)
-                    author_normalized = BookImportService.normalize_text(author_raw)
-                    
-                    # Query all books and check normalized versions
-                    existing_book = None
-                    if title_normalized and author_normalized:
-                        all_books = Book.query.all()
-                        for book in all_books:
-                            if (BookImportService.normalize_text(book.title) == title_normalized and
-                                BookImportService.normalize_text(book.author) == author_normalized):
-                                existing_book = book
-                                break
-                    
-                    if existing_book:
-                        result['errors'].append(f"Row {row_num}: Book '{title_raw}' by '{author_raw}' already exists (matches '{existing_book.title}' by '{existing_book.author}')")
-                        result['error_count'] += 1
-                        if debug:
-                            print(f"Debug: Skipping existing book '{title_raw}' by '{author_raw}'")
-                        continue
-                    
-                    record = CSVBookRecord.from_dict(row)
-                    if not skip_enrichment and record.enrichable():
-                        works = OpenLibraryService.author_title_search(title=record.title, author=record.author, fields="all", limit=1)
-                        work = select_best_work(works)
-                        record.update_from_openlibrary_work(work, quick=True, ask=False)
-
-                    book = Book(
-                        title=record.title,
-                        author=record.author,
-                        book_type=record.book_type,
-                        genre=record.genre,
-                        sub_genre=record.sub_genre,
-                        topic=record.topic,
-                        lexile_rating=record.lexile_rating,
-                        grade=record.grade,
-                        owned=record.owned,
-                        openlibrary_id=record.openlibrary_id,
-                        description=record.description,
-                        cover_url=record.cover_url,
-                        publication_year=record.publication_year
-                    )
-                    # # Try to enrich from OpenLibrary if ISBN is provided
-                    # if isbn:
-                    #     try:
-                    #         ol_data = OpenLibraryService.get_book_by_isbn(isbn)
-                    #     except Exception as e:
-                    #         # Continue even if OpenLibrary lookup fails
-                    #         print(f"OpenLibrary lookup failed for {isbn}: {e}")
-
-                    #     if ol_data:
-                    #         if not book.title:
-                    #             book.title = ol_data.get('title', '')
-                    #         if not book.author:
-                    #             book.author = ol_data.get('author', '')
-                    #         book.openlibrary_id = ol_data.get('openlibrary_id', '')
-                    #         book.description = ol_data.get('description', '')
-                    #         book.cover_url = ol_data.get('cover_url', '')
-                    #         book.publication_year = ol_data.get('publication_year')
-                    #         # Don't override genre/topic from CSV if they exist
-                    #         if not book.genre and ol_data.get('genre'):
-                    #             book.genre = ol_data.get('genre', '')
-
-                    # else:
-                    #     enrich_book_from_openlibrary(book)
+            
+            # Normalized (title, author) -> row number of rows already accepted from this file
+            seen_rows = {}
+            records = []
+            try:
+                csv_rows = enumerate(csv_reader, start=2)  # Start at 2 (1 is header)
+                # Parse in bounded chunks so only one chunk of raw rows is held at a time,
+                # looking up catalogue duplicates once per chunk rather than once per row
+                while chunk := list(itertools.islice(csv_rows, IMPORT_CHUNK_ROWS)):
+                    # Normalized (title, author) of catalogue books sharing a title with this chunk
+                    existing_books = BookImportService._existing_books_by_norm({
+                        BookImportService.normalize_text((row.get('title') or '').strip()) for _, row in chunk
+                    })
                     
-                    if not debug:
+                    for row_num, row in chunk:
                         try:
-                            db.session.add(book)
-                            db.session.flush()  # Check for constraint violations before commit
-                            result['success_count'] += 1
-                        except Exception as add_error:
-                            db.session.rollback()
-                            result['errors'].append(f"Row {row_num}: Failed to add book - {str(add_error)}")
-                            result['error_count'] += 1
-                    else:
-                        print(f"Debug: Would add book: {book}")
-                        result['success_count'] += 1
-                    
-                except Exception as e:
-                    if debug:
-                        print(f"Debug: Error processing row {row_num}: {e}")
-                        print(f"Row data: {row}")
+                            if 'title' not in row or 'author' not in row:
+                                raise ValueError("Missing required 'title' or 'author' field")
+                            
+                            # Check if book already exists by title+author (fuzzy match)
+                            title_raw = (row.get('title') or '').strip()
+                            author_raw = (row.get('author') or '').strip()
+                            
+                            # Normalize for fuzzy matching
+                            title_normalized = BookImportService.normalize_text(title_raw)
+                            author_normalized = BookImportService.normalize_text(author_raw)
+                            
+                            key = (title_normalized, author_normalized)
+                            if title_normalized and author_normalized and key in seen_rows:
+                                result['errors'].append(f"Row {row_num}: Book '{title_raw}' by '{author_raw}' duplicates row {seen_rows[key]}")
+                                result['error_count'] += 1
+                                continue
+                            
+                            existing_book = None
+                            if title_normalized and author_normalized:
+                                existing_book = existing_books.get(key)
+                            
+                            if existing_book:
+                                result['errors'].append(f"Row {row_num}: Book '{title_raw}' by '{author_raw}' already exists (matches '{existing_book[0]}' by '{existing_book[1]}')")
+                                result['error_count'] += 1
+                                if debug:
+                                    print(f"Debug: Skipping existing book '{title_raw}' by '{author_raw}'")
+                                continue
+                            
+                            record = CSVBookRecord.from_dict(row)
+                            if record.owned not in OWNED_OPTIONS:
+                                raise ValueError(f"Invalid owned value '{record.owned}'")
+                            if record.book_type is not None and record.book_type not in BOOK_TYPES:
+                                raise ValueError(f"Invalid book_type '{record.book_type}'")
+                            if title_normalized and author_normalized:
+                                seen_rows[key] = row_num
+                            records.append((row_num, record))
+                            
+                        except Exception as e:
+                            if debug:
+                                print(f"Debug: Error processing row {row_num}: {e}")
+                                print(f"Row data: {row}")
 
-                    result['errors'].append(f"Row {row_num}: {str(e)}")
-                    result['error_count'] += 1
+                            result['errors'].append(f"Row {row_num}: {str(e)}")
+                            result['error_count'] += 1
+            finally:
+                if stream is not None:
+                    # Leave the upload's own stream open for its owner to close, even if
+                    # decoding or parsing failed
+                    stream.detach()
+            
+            # Enrich from OpenLibrary once all rows are parsed, so the lookups can
+            # run concurrently instead of one round trip per row
+            if not skip_enrichment:
+                to_enrich = [(i, record) for i, (_, record) in enumerate(records) if record.enrichable()]
+                works = fetch_openlibrary_works([record for _, record in to_enrich])
+                for (i, record), work in zip(to_enrich, works):
+                    if work is None:
+                        continue
+                    row_num = records[i][0]
+                    try:
+                        records[i] = (row_num, record.update_from_openlibrary_work(WorkWrapper(work, ask=False), quick=True))
+                    except Exception as e:
+                        # Keep the row as given in the CSV
+                        logger.warning("OpenLibrary enrichment failed for row %s: %s", row_num, e)
+            
+            rows = []
+            for row_num, record in records:
+                values = dict(
+                    title=record.title,
+                    author=record.author,
+                    # Set explicitly: the bulk INSERT below bypasses the ORM insert hook
+                    title_norm=BookImportService.normalize_text(record.title),
+                    author_norm=BookImportService.normalize_text(record.author),
+                    book_type=record.book_type,
+                    genre=record.genre,
+                    sub_genre=record.sub_genre,
+                    topic=record.topic,
+                    lexile_rating=record.lexile_rating,
+                    grade=record.grade,
+                    owned=record.owned,
+                    openlibrary_id=record.openlibrary_id,
+                    description=record.description,
+                    cover_url=record.cover_url,
+                    publication_year=record.publication_year
+                )
+                if not debug:
+                    rows.append((row_num, values))
+                else:
+                    print(f"Debug: Would add book: {Book(**values)}")
+                    result['success_count'] += 1
 
-            if not debug:
-                db.session.commit()
+            if rows:
+                BookImportService._insert_rows(rows, result)
             
         except Exception as e:
             db.session.rollback()
@@ -203,6 +235,43 @@ class BookImportService:
         
         return result
     
+    @staticmethod
+    def _existing_books_by_norm(title_norms: set[str]) -> dict:
+        """Map (title_norm, author_norm) -> (title, author) for books with any of the given title_norms"""
+        existing_books = {}
+        title_norms = sorted(t for t in title_norms if t)
+        # Chunked to stay under database bind-parameter limits
+        for start in range(0, len(title_norms), 500):
+            matches = db.session.query(Book.title, Book.author, Book.title_norm, Book.author_norm).filter(
+                Book.title_norm.in_(title_norms[start:start + 500])
+            )
+            for title, author, title_norm, author_norm in matches:
+                existing_books.setdefault((title_norm, author_norm), (title, author))
+        return existing_books
+    
+    @staticmethod
+    def _insert_rows(rows: list[tuple[int, dict]], result: dict) -> None:
+        """Insert (row_num, values) pairs in one batch, retrying row by row if the batch fails"""
+        try:
+            # One executemany INSERT and one commit for the whole file
+            db.session.execute(db.insert(Book), [values for _, values in rows])
+            db.session.commit()
+            result['success_count'] += len(rows)
+            return
+        except Exception:
+            db.session.rollback()
+        
+        # Something in the batch was rejected; find it without losing the good rows
+        for row_num, values in rows:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(db.insert(Book), values)
+                result['success_count'] += 1
+            except Exception as add_error:
+                result['errors'].append(f"Row {row_num}: Failed to add book - {str(add_error)}")
+                result['error_count'] += 1
+        db.session.commit()
+    
     @staticmethod
     def create_sample_csv() -> str:
         """Generate sample CSV content for download"""
@@ -14,5 +14,13 @@ class Config:
         _db_url = _db_url.replace('postgres://', 'postgresql://', 1)
     SQLALCHEMY_DATABASE_URI = _db_url or 'sqlite:///' + os.path.join(basedir, 'bookapp.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Pool sizing only applies to server databases; SQLite picks its own pool class
+    SQLALCHEMY_ENGINE_OPTIONS = {} if SQLALCHEMY_DATABASE_URI.startswith('sqlite') else {
+        'pool_size': 10,
+        'max_overflow': 20,
+        'pool_pre_ping': True,  # Drop connections the server has closed
+        'pool_recycle': 1800,
+        'pool_use_lifo': True,  # Reuse warm connections; idle extras age out via pool_recycle
+    }
     OPENLIBRARY_API_URL = 'https://openlibrary.org'
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
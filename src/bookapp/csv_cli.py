@@ -1,6 +1,7 @@
 """Quick and easy CLI interface for updating CSV file info from openlibrary.org."""
 
 import csv
+import logging
 import pickle
 from typing import Literal, Self
 from cyclopts import App
@@ -9,9 +10,10 @@ from pathlib import Path
 import questionary as qs
 from rich.console import Console
 from bookapp.openlibrary_service import OpenLibraryWork, OpenLibraryService
-import re
+from bookapp.models import normalize_text
 
 cns = Console()
+logger = logging.getLogger(__name__)
 app = App()
 
 def get_flask_app():
@@ -60,65 +62,49 @@ def add_topic_to_db(topic_name: str):
             db.session.commit()
             print(f"Added new topic to database: {topic_name}")
 
+def infer_book_type(subjects: list[str]) -> Literal['Fiction', 'Non-Fiction', None]:
+    """Infer the book type from OpenLibrary subjects in a single pass.
+
+    Any non-fiction subject wins; otherwise an exact 'fiction' subject means Fiction.
+    """
+    book_type = None
+    for s in subjects:
+        sl = s.lower()
+        if 'non-fiction' in sl or 'nonfiction' in sl or 'non fiction' in sl:
+            return 'Non-Fiction'
+        if sl == 'fiction':
+            book_type = 'Fiction'
+    return book_type
+
 def get_best_bet_genres_from_subjects(subjects: list[str]) -> dict[str, str]:
     """Given a list of subjects, return the best book_type, genre, and sub_genre matches."""
     from bookapp.models import Genre
 
-    book_type = None
     genre = None
     sub_genre = None
 
     lower_subjects = [s.lower() for s in subjects]
-
-    if any('non-fiction' in s or 'nonfiction' in s or 'non fiction' in s for s in lower_subjects):
-        book_type = 'Non-Fiction'
-    elif 'fiction' in lower_subjects:
-        book_type = 'Fiction'
+    book_type = infer_book_type(subjects)
 
     if book_type:
         known_genres = get_genres_from_db(book_type)
     else:
         known_genres = get_genres_from_db('Fiction') | get_genres_from_db('Non-Fiction')
 
-    lower_known_genres = [g.lower() for g in known_genres.keys()]
-    norm_map = dict(zip(lower_known_genres, known_genres.keys()))
-    possible_genres = [
-        norm_map[g]
-        for g  in lower_subjects
-        if g in lower_known_genres
-    ]
-
-    if possible_genres:
-        genre = possible_genres[0]  # Take the first match
+    norm_map = {g.lower(): g for g in known_genres}
+    # First subject that names a known genre
+    genre = next((norm_map[s] for s in lower_subjects if s in norm_map), None)
 
-        # Now find sub-genre
-        known_sub_genres = known_genres[genre]
-        lower_known_sub_genres = [sg.lower() for sg in known_sub_genres]
-
-        if possible_sub_genres := [
-            known_sub_genres[idx]
-            for idx, sg in enumerate(lower_known_sub_genres)
-            if sg in lower_subjects
-        ]:
-            sub_genre = possible_sub_genres[0]  # Take the first match
+    if genre is not None:
+        # Now find sub-genre: first known sub-genre that appears among the subjects
+        subject_set = set(lower_subjects)
+        sub_genre = next((sg for sg in known_genres[genre] if sg.lower() in subject_set), None)
 
     if book_type is None and genre is not None:
         book_type =  Genre.query.filter_by(name=genre).first().book_type
 
     return {'book_type': book_type, 'genre': genre, 'sub_genre': sub_genre}
 
-def normalize_text(text: str) -> str:
-    """Normalize text for fuzzy matching: lowercase, strip punctuation, normalize whitespace"""
-    if not text:
-        return ""
-    # Lowercase
-    normalized = text.lower()
-    # Remove punctuation (keep only alphanumeric and spaces)
-    normalized = re.sub(r'[^\w\s]', '', normalized)
-    # Normalize whitespace (collapse multiple spaces to single space, strip edges)
-    normalized = re.sub(r'\s+', ' ', normalized).strip()
-    return normalized
-
 @attrs.define
 class WorkWrapper:
     work: OpenLibraryWork
@@ -129,10 +115,7 @@ class WorkWrapper:
     
     def get_book_type(self) -> Literal['Fiction', 'Non-Fiction', None]:
         """Infer book type from subjects."""
-        subjects = self.work.subject or []
-        non_fiction_subjects = [s for s in subjects if 'non-fiction' in s.lower() or 'nonfiction' in s.lower() or 'non fiction' in s.lower()]
-        
-        out = 'Non-Fiction' if non_fiction_subjects else "Fiction" if any(s.lower() == 'fiction' for s in subjects) else None
+        out = infer_book_type(self.work.subject or [])
         
         if out is None and self.ask:
             # Ask user to select
@@ -194,19 +177,11 @@ class WorkWrapper:
         """Get topic from subjects."""
         subjects = self.work.subjects or []
         known_topics = get_topics_from_db()
-        lower_subjects = [s.lower() for s in subjects]
-        lower_known_topics = [t.lower() for t in known_topics]
-        possible_topics = []
-
-        possible_topics.extend(
-            subjects[idx]
-            for idx, s in enumerate(lower_subjects)
-            if s in lower_known_topics
-        )
-        # Go through and add all other subjects that are not already known topics
-        possible_topics.extend(
-            subj for subj in subjects if subj.lower() not in lower_known_topics
-        )
+        lower_known_topics = {t.lower() for t in known_topics}
+        is_known = [s.lower() in lower_known_topics for s in subjects]
+        # Known topics first, then all other subjects
+        possible_topics = [subj for subj, known in zip(subjects, is_known) if known]
+        possible_topics.extend(subj for subj, known in zip(subjects, is_known) if not known)
         # Ask user to select
         if possible_topics and self.ask:
             topic = qs.select(
@@ -270,7 +245,6 @@ class CSVBookRecord:
     
     def update_from_openlibrary_work(self, work: WorkWrapper, quick: bool = False) -> Self:
         """Update the record with data from an OpenLibrary work."""
-        print("in update_from_openlibrary_work")
         if quick and not work.ask:
             genres = get_best_bet_genres_from_subjects(work.work.subject or [])
             book_type = genres['book_type']
@@ -285,24 +259,26 @@ class CSVBookRecord:
                 genre = None
                 sub_genre = None
             
-        print(f"book_type={book_type}, genre={genre}, sub_genre={sub_genre}")
+        logger.debug("book_type=%s, genre=%s, sub_genre=%s", book_type, genre, sub_genre)
         topic = work.get_topic()
         olid = work.work.olid
         description = work.work.description
         cover_url = f"https://covers.openlibrary.org/b/id/{work.work.cover_i}-L.jpg"
         publication_year = work.work.first_publish_year
 
-        print(f"topic={topic}, olid={olid}, description={description}, cover_url={cover_url}, publication_year={publication_year}")
+        logger.debug("topic=%s, olid=%s, description=%s, cover_url=%s, publication_year=%s",
+                     topic, olid, description, cover_url, publication_year)
         
         # Check one last time if this should be accepted
         if not quick:
+            print(f"book_type={book_type}, genre={genre}, sub_genre={sub_genre}")
+            print(f"topic={topic}, olid={olid}, description={description}, cover_url={cover_url}, publication_year={publication_year}")
             confirm = qs.confirm(
                 f"Apply these updates to '{self.title}' by '{self.author}'?", default=True
             ).ask()
             if not confirm:
                 return self
         
-        print("Applying updates...")
         return attrs.evolve(
             self,
             openlibrary_id=olid or self.openlibrary_id,
@@ -1,10 +1,33 @@
 from datetime import datetime
+import functools
+import re
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 
 db = SQLAlchemy()
 
+# Allowed values for Book.book_type and Book.owned
+BOOK_TYPES = frozenset({'Fiction', 'Non-Fiction'})
+OWNED_OPTIONS = frozenset({'Physical', 'Kindle', 'Not Owned', 'Audible'})
+
+_PUNCT_RE = re.compile(r'[^\w\s]')
+_WS_RE = re.compile(r'\s+')
+
+@functools.lru_cache(maxsize=8192)
+def normalize_text(text: str) -> str:
+    """Normalize text for fuzzy matching: lowercase, strip punctuation, normalize whitespace"""
+    if not text:
+        return ""
+    # Lowercase
+    normalized = text.lower()
+    # Remove punctuation (keep only alphanumeric and spaces)
+    normalized = _PUNCT_RE.sub('', normalized)
+    # Normalize whitespace (collapse multiple spaces to single space, strip edges)
+    normalized = _WS_RE.sub(' ', normalized).strip()
+    return normalized
+
 # Association table for many-to-many relationship between classes and students
 class_students = db.Table('class_students',
     db.Column('class_id', db.Integer, db.ForeignKey('class.id'), primary_key=True),
@@ -76,16 +99,21 @@ class Class(db.Model):
 class Book(db.Model):
     __table_args__ = (
         db.UniqueConstraint('author', 'title', name='uq_author_title'),
+        db.Index('ix_book_type_grade', 'book_type', 'grade'),
+        db.Index('ix_book_title_author_norm', 'title_norm', 'author_norm'),
     )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     author = db.Column(db.String(200))
+    # normalize_text() of title/author, kept in sync on insert/update, for duplicate lookups
+    title_norm = db.Column(db.String(200))
+    author_norm = db.Column(db.String(200))
     openlibrary_id = db.Column(db.String(50))
     # New metadata
     book_type = db.Column(db.String(20))  # 'Fiction' or 'Non-Fiction'
-    sub_genre = db.Column(db.String(100))
-    genre = db.Column(db.String(100))
+    sub_genre = db.Column(db.String(100), index=True)
+    genre = db.Column(db.String(100), index=True)
     topic = db.Column(db.String(100))
     lexile_rating = db.Column(db.String(20))
     grade = db.Column(db.Integer)  # Intended grade level (1-12)
@@ -105,13 +133,27 @@ class Book(db.Model):
     
     def has_reviews(self):
         """Check if this book has any student reviews"""
-        return len(self.reviews) > 0
+        # EXISTS query rather than loading every review into self.reviews
+        return db.session.query(Review.query.filter_by(book_id=self.id).exists()).scalar()
     
     def __repr__(self):
         return f'<Book {self.title}>'
 
 
+@event.listens_for(Book, 'before_insert')
+@event.listens_for(Book, 'before_update')
+def _set_book_norms(mapper, connection, book):
+    book.title_norm = normalize_text(book.title)
+    book.author_norm = normalize_text(book.author)
+
+
 class ReadingListItem(db.Model):
+    __table_args__ = (
+        db.Index('ix_reading_list_item_user_book', 'user_id', 'book_id'),
+        db.Index('ix_reading_list_item_user_order', 'user_id', 'order'),
+        db.Index('ix_reading_list_item_book', 'book_id'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     book_id = db.Column(db.Integer, db.ForeignKey('book.id'), nullable=False)
@@ -122,11 +164,25 @@ class ReadingListItem(db.Model):
     user = db.relationship('User', back_populates='reading_list')
     book = db.relationship('Book', back_populates='reading_list_items')
     
+    @classmethod
+    def append(cls, user_id, book_id):
+        """Add a book to the end of a user's reading list in a single INSERT"""
+        next_order = db.select(
+            db.func.coalesce(db.func.max(cls.order), 0) + 1
+        ).where(cls.user_id == user_id).scalar_subquery()
+        db.session.execute(db.insert(cls).values(user_id=user_id, book_id=book_id, order=next_order))
+    
     def __repr__(self):
         return f'<ReadingListItem User:{self.user_id} Book:{self.book_id}>'
 
 
 class BookRead(db.Model):
+    __table_args__ = (
+        db.Index('ix_book_read_user_book', 'user_id', 'book_id'),
+        db.Index('ix_book_read_user_completed', 'user_id', 'completed_at'),
+        db.Index('ix_book_read_book', 'book_id'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     book_id = db.Column(db.Integer, db.ForeignKey('book.id'), nullable=False)
@@ -141,6 +197,11 @@ class BookRead(db.Model):
 
 
 class Review(db.Model):
+    __table_args__ = (
+        db.Index('ix_review_user_book', 'user_id', 'book_id'),
+        db.Index('ix_review_book_rating', 'book_id', 'rating'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     book_id = db.Column(db.Integer, db.ForeignKey('book.id'), nullable=False)
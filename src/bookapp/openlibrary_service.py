@@ -1,7 +1,34 @@
+import copy
+import functools
+import logging
 import requests
+from requests.adapters import HTTPAdapter
 from typing import Any
+from urllib3.util.retry import Retry
 import attrs
 
+logger = logging.getLogger(__name__)
+
+# Network failures, bad JSON, and payloads missing the fields we expect
+_LOOKUP_ERRORS = (requests.RequestException, ValueError, KeyError, TypeError)
+
+class _IncompleteBook(Exception):
+    """Carries an ISBN book whose author/work lookup failed out of the cached fetch,
+    so it is still returned to the caller but never cached"""
+    def __init__(self, book: dict[str, Any]):
+        super().__init__(book.get('isbn'))
+        self.book = book
+
+# One pooled session for all OpenLibrary requests, so keep-alive connections are
+# reused across calls and threads instead of a new TCP/TLS handshake per request
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504]),
+))
+_SESSION.headers.update({'User-Agent': 'bookapp/1.0'})
+
 @attrs.define
 class OpenLibraryWork:
     """Data class representing an OpenLibrary Work
@@ -45,6 +72,11 @@ class OpenLibraryWork:
     @property
     def olid(self):
         return self.key
+
+# Search doc keys that map onto OpenLibraryWork fields
+_WORK_FIELD_NAMES = tuple(field.name for field in attrs.fields(OpenLibraryWork))
+_WORK_FIELDS = frozenset(_WORK_FIELD_NAMES)
+
 class OpenLibraryService:
     """Service for interacting with OpenLibrary API"""
     
@@ -69,109 +101,148 @@ class OpenLibraryService:
         limit: int = 10
     ) -> list[OpenLibraryWork]:
         """Search for books with arbitrary query string.
+
+        Successful searches are cached in process, so re-importing or re-enriching
+        the same books doesn't repeat the request.
         """
         if not fields:
             fields = None
         elif fields == "all":
-            fields = [field.name for field in attrs.fields(OpenLibraryWork)]
+            fields = _WORK_FIELD_NAMES
 
         try:
-            url = f"{OpenLibraryService.BASE_URL}/search.json"
-            params = {
-                'q': query,
-                'limit': limit,
-                'fields': ','.join(fields) if fields else None
-            }
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-
-            # Remove any keys that aren't in OpenLibraryWork
-            valid_keys = {field.name for field in attrs.fields(OpenLibraryWork)}
-            filtered_docs = [
-                {k: v for k, v in doc.items() if k in valid_keys}
-                for doc in data.get('docs', [])
-            ]
-            return [OpenLibraryWork(**doc) for doc in filtered_docs]
-        except Exception as e:
-            print(f"Error searching OpenLibrary: {e}")
+            docs = OpenLibraryService._fetch_search_docs(query, tuple(fields) if fields else None, limit)
+            # Deep copy so callers can't mutate the cached docs' list fields
+            return [OpenLibraryWork(**copy.deepcopy(doc)) for doc in docs]
+        except _LOOKUP_ERRORS as e:
+            logger.warning("OpenLibrary search failed for %r: %s", query, e)
             return []
     
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def _fetch_search_docs(query: str, fields: tuple[str, ...] | None, limit: int) -> tuple[dict, ...]:
+        """Run a search request and return the docs, raising on failure"""
+        url = f"{OpenLibraryService.BASE_URL}/search.json"
+        params = {
+            'q': query,
+            'limit': limit,
+            'fields': ','.join(fields) if fields else None
+        }
+        response = _SESSION.get(url, params=params, timeout=10)
+        response.raise_for_status()
+        data = response.json()
+
+        # Remove any keys that aren't in OpenLibraryWork
+        return tuple(
+            {k: doc[k] for k in _WORK_FIELDS & doc.keys()}
+            for doc in data.get('docs', [])
+        )
+    
     @staticmethod
     def get_book_by_isbn(isbn: str) -> dict[str, Any] | None:
-        """Get book details by ISBN"""
+        """Get book details by ISBN
+
+        Successful lookups are cached for the life of the process, since edition
+        data for an ISBN does not change; failures are not cached. Callers get a
+        deep copy, so mutating the result (e.g. its subjects list) can't leak
+        into later cache hits.
+        """
         try:
-            url = f"{OpenLibraryService.BASE_URL}/isbn/{isbn}.json"
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            # Get work details for more info
-            work_key = None
-            if 'works' in data and len(data['works']) > 0:
-                work_key = data['works'][0]['key']
-            
-            book = {
-                'title': data.get('title', ''),
-                'openlibrary_id': data.get('key', ''),
-                'isbn': isbn,
-                'publication_year': data.get('publish_date', ''),
-                'publisher': ', '.join(data.get('publishers', [])) if data.get('publishers') else ''
-            }
-            
-            # Get author information
-            if 'authors' in data and len(data['authors']) > 0:
-                author_key = data['authors'][0]['key']
-                author_data = OpenLibraryService.get_author(author_key)
-                book['author'] = author_data.get('name', '') if author_data else ''
-            
-            # Get additional details from work
-            if work_key:
-                work_data = OpenLibraryService.get_work(work_key)
-                if work_data:
-                    book['description'] = work_data.get('description', '')
-                    if isinstance(book['description'], dict):
-                        book['description'] = book['description'].get('value', '')
-                    subjects = work_data.get('subject', []) or []
-                    # keep original behavior
-                    book['genre'] = ', '.join(subjects[:3]) if subjects else ''
-                    # also provide raw subjects for downstream inference
-                    book['subjects'] = subjects
-            
-            # Get cover URL
-            if 'covers' in data and len(data['covers']) > 0:
-                cover_id = data['covers'][0]
-                book['cover_url'] = f"https://covers.openlibrary.org/b/id/{cover_id}-L.jpg"
-            
-            return book
-        except Exception as e:
-            print(f"Error getting book by ISBN: {e}")
+            return copy.deepcopy(OpenLibraryService._fetch_book_by_isbn(isbn))
+        except _IncompleteBook as e:
+            return e.book
+        except _LOOKUP_ERRORS as e:
+            logger.warning("OpenLibrary ISBN lookup failed for %s: %s", isbn, e)
             return None
     
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _fetch_book_by_isbn(isbn: str) -> dict[str, Any]:
+        """Fetch and assemble book details for an ISBN, raising on failure.
+
+        If only the author or work lookup fails, the partial book is raised as
+        _IncompleteBook so lru_cache doesn't keep it.
+        """
+        url = f"{OpenLibraryService.BASE_URL}/isbn/{isbn}.json"
+        response = _SESSION.get(url, timeout=10)
+        response.raise_for_status()
+        data = response.json()
+        
+        # Get work details for more info
+        work_key = None
+        if 'works' in data and len(data['works']) > 0:
+            work_key = data['works'][0]['key']
+        
+        book = {
+            'title': data.get('title', ''),
+            'openlibrary_id': data.get('key', ''),
+            'isbn': isbn,
+            'publication_year': data.get('publish_date', ''),
+            'publisher': ', '.join(data.get('publishers', [])) if data.get('publishers') else ''
+        }
+        
+        author_key = None
+        if 'authors' in data and len(data['authors']) > 0:
+            author_key = data['authors'][0]['key']
+        
+        complete = True
+        
+        # Get author information
+        if author_key:
+            author_data = OpenLibraryService.get_author(author_key)
+            book['author'] = author_data.get('name', '') if author_data else ''
+            complete = complete and author_data is not None
+        
+        # Get additional details from work
+        if work_key:
+            work_data = OpenLibraryService.get_work(work_key)
+            complete = complete and work_data is not None
+            if work_data:
+                book['description'] = work_data.get('description', '')
+                if isinstance(book['description'], dict):
+                    book['description'] = book['description'].get('value', '')
+                subjects = work_data.get('subject', []) or []
+                # keep original behavior
+                book['genre'] = ', '.join(subjects[:3]) if subjects else ''
+                # also provide raw subjects for downstream inference
+                book['subjects'] = subjects
+        
+        # Get cover URL
+        if 'covers' in data and len(data['covers']) > 0:
+            cover_id = data['covers'][0]
+            book['cover_url'] = f"https://covers.openlibrary.org/b/id/{cover_id}-L.jpg"
+        
+        if not complete:
+            raise _IncompleteBook(book)
+        return book
+    
     @staticmethod
     def get_work(work_key: str) -> dict[str, Any] | None:
-        """Get work details from OpenLibrary"""
+        """Get work details from OpenLibrary (successful lookups are cached)"""
         try:
-            url = f"{OpenLibraryService.BASE_URL}{work_key}.json"
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            print(f"Error getting work: {e}")
+            return copy.deepcopy(OpenLibraryService._fetch_json(work_key))
+        except _LOOKUP_ERRORS as e:
+            logger.warning("OpenLibrary work lookup failed for %s: %s", work_key, e)
             return None
     
     @staticmethod
     def get_author(author_key: str) -> dict[str, Any] | None:
-        """Get author details from OpenLibrary"""
+        """Get author details from OpenLibrary (successful lookups are cached)"""
         try:
-            url = f"{OpenLibraryService.BASE_URL}{author_key}.json"
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            print(f"Error getting author: {e}")
+            return copy.deepcopy(OpenLibraryService._fetch_json(author_key))
+        except _LOOKUP_ERRORS as e:
+            logger.warning("OpenLibrary author lookup failed for %s: %s", author_key, e)
             return None
     
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _fetch_json(key: str) -> dict[str, Any]:
+        """Fetch the JSON record for an OpenLibrary key, raising on failure"""
+        url = f"{OpenLibraryService.BASE_URL}{key}.json"
+        response = _SESSION.get(url, timeout=10)
+        response.raise_for_status()
+        return response.json()
+    
     @staticmethod
     def get_cover_url(isbn: str = None, cover_id: int = None, size: str = 'M') -> str:
         """